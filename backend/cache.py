@@ -0,0 +1,109 @@
+
+"""
+Simple on-disk cache with TTL
+Used to avoid re-fetching the same Screener.in pages on repeat queries
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Optional
+
+
+class FileCache:
+    """JSON file cache where each entry expires after ttl_seconds"""
+
+    def __init__(self, dir: str = ".cache", ttl_seconds: float = 6 * 60 * 60):
+        self.dir = dir
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(self.dir, exist_ok=True)
+        self.sweep()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.dir, hashlib.md5(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired; expired entries are deleted"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get('ts', 0) > self.ttl_seconds:
+            self._remove(path)
+            return None
+        return entry.get('data')
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value, replacing the file atomically"""
+        tmp_path = None
+        try:
+            # A unique temp file per write, so concurrent writers of the same key don't collide
+            fd, tmp_path = tempfile.mkstemp(dir=self.dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'ts': time.time(), 'data': value}, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error writing cache entry: {e}")
+            if tmp_path:
+                self._remove(tmp_path)
+
+    def sweep(self) -> None:
+        """Delete entries (and temp files left by crashed writes) older than the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            names = os.listdir(self.dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def cached(cache: FileCache, key: Callable[..., str], should_cache: Callable[[Any], bool] = lambda value: value is not None):
+    """Cache a function's result under key(*args, **kwargs); works for sync and async functions"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache_key = key(*args, **kwargs)
+                # File reads/writes and JSON (de)serialization stay off the event loop
+                value = await asyncio.to_thread(cache.get, cache_key)
+                if value is not None:
+                    return value
+                value = await func(*args, **kwargs)
+                if should_cache(value):
+                    await asyncio.to_thread(cache.set, cache_key, value)
+                return value
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs)
+            value = cache.get(cache_key)
+            if value is not None:
+                return value
+            value = func(*args, **kwargs)
+            if should_cache(value):
+                cache.set(cache_key, value)
+            return value
+        return wrapper
+
+    return decorator
@@ -1,39 +1,62 @@
 import os
 import sys
-import html
-import re
-from typing import List, Dict, Any, Optional
+import asyncio
+import json
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Literal
 
-# Set encoding to utf-8 for console output
-sys.stdout.reconfigure(encoding='utf-8')
-
-# 1. Setup
+import uvicorn
 from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langgraph.graph import StateGraph, MessagesState, START, END
+from langgraph.prebuilt import ToolNode
+from pydantic import BaseModel, Field
 
-# Load environment variables
-load_dotenv()
+from resilience import CircuitBreaker, backoff_delay
+from screnner_tool import ScreenerTool
 
-# 1. Setup
-if not os.getenv("GOOGLE_API_KEY"):
-    print("Error: GOOGLE_API_KEY not found in environment variables.")
-    print("Please create a .env file in the backend directory with your API key.")
-
-os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
-
-# Configure Safety Settings to be permissive
-safety_settings = {
-    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-}
+# Set encoding to utf-8 for console output (the Windows console defaults to a legacy code page)
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash", 
-    temperature=0.3,
-    max_retries=3,
-    safety_settings=safety_settings
-)
+# 1. Setup
+@lru_cache(maxsize=None)
+def get_llm():
+    """Create the Gemini client on first use so importing this module stays cheap"""
+    from langchain_google_genai import ChatGoogleGenerativeAI, HarmBlockThreshold, HarmCategory
+
+    # Load environment variables
+    load_dotenv()
+    if not os.getenv("GOOGLE_API_KEY"):
+        print("Error: GOOGLE_API_KEY not found in environment variables.")
+        print("Please create a .env file in the backend directory with your API key.")
+
+    # Configure Safety Settings to be permissive
+    safety_settings = {
+        HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+        HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+        HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+        HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+    }
+
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash", 
+        temperature=0.3,
+        # ainvoke_with_retry owns retries so the circuit breaker sees every failed call
+        max_retries=0,
+        safety_settings=safety_settings
+    )
+
+@lru_cache(maxsize=None)
+def get_llm_with_tools():
+    return get_llm().bind_tools(tools)
+
+@lru_cache(maxsize=None)
+def get_structured_llm(schema):
+    return get_llm().with_structured_output(schema)
 
 # Initialize FastAPI app
 app = FastAPI()
@@ -55,6 +78,16 @@ class ApprovalRequest(BaseModel):
     thread_id: str
     approved: bool = True
 
+# Structured outputs of the filter and risk agents, passed to the report agent as JSON
+class FilterResult(BaseModel):
+    kept: List[str] = Field(description="Companies with sound fundamentals, named as in the data")
+    dropped: List[str] = Field(description="Companies filtered out for poor fundamentals")
+    rationale: Dict[str, str] = Field(description="Short reason for each company's decision, keyed by company name")
+
+class RiskAssessment(BaseModel):
+    per_stock: Dict[str, Literal['LOW', 'MEDIUM', 'HIGH']] = Field(description="Risk level for each company, keyed by company name")
+    justification: Dict[str, str] = Field(description="Specific data points supporting each risk level, keyed by company name")
+
 # 2. Define Tools
 screener = ScreenerTool()
 tools = [screener]
@@ -81,38 +114,147 @@ INSTRUCTIONS:
 - Call the tool with the stock symbol or company name.
 - IMPORTANT: After calling the tool, you MUST wait for the tool result before providing analysis.
 - When you receive tool results, provide a brief summary of what data was fetched.
+- When you need multiple independent pieces of information, call all the relevant tools in a single response so they run in parallel. Call tools sequentially only when a later call depends on an earlier result.
 
 Example: If asked about "Wipro", use the ScreenerTool(stock_name="Wipro") to get the data.
+Example: If asked to compare "Reliance" and "TCS", call the ScreenerTool for both companies in the same response.
 """
 
-llm_with_tools = llm.bind_tools(tools)
-
-def invoke_with_retry(model, messages, retries=3):
-    """Helper to retry model invocation on empty output error"""
+# Shared by all agents so an outage trips it once for the whole process
+gemini_breaker = CircuitBreaker("Gemini", failure_threshold=5, reset_timeout=30)
+
+EMPTY_OUTPUT_ERROR = "model output must contain either output text or tool calls"
+# Rate limits and server-side failures; google.api_core and google.genai errors carry these as .code
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def is_transient_error(e: BaseException) -> bool:
+    """Classify on the exception type or status code of the error and its causes, never the message"""
+    while e is not None:
+        if isinstance(e, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+            return True
+        code = getattr(e, 'code', None) or getattr(e, 'status_code', None)
+        if isinstance(code, int) and code in TRANSIENT_STATUS_CODES:
+            return True
+        e = e.__cause__
+    return False
+
+async def ainvoke_with_retry(model, messages, retries=3):
+    """Helper to retry model invocation on empty output or transient errors"""
     for i in range(retries):
+        # Raises CircuitOpenError without calling Gemini while the circuit is open
+        gemini_breaker.check()
         try:
-            response = model.invoke(messages)
+            response = await model.ainvoke(messages)
+            gemini_breaker.record_success()
             return response
+        except asyncio.CancelledError:
+            gemini_breaker.record_release()
+            raise
         except Exception as e:
-            if "model output must contain either output text or tool calls" in str(e) and i < retries - 1:
-                print(f"Empty response error, retrying ({i+1}/{retries})...")
-                time.sleep(1)
+            empty_output = EMPTY_OUTPUT_ERROR in str(e)
+            transient = is_transient_error(e)
+            # Only outages and rate limits count against the circuit; empty outputs, bad
+            # requests and validation errors mean Gemini answered
+            if transient:
+                gemini_breaker.record_failure()
+            else:
+                gemini_breaker.record_release()
+            if (empty_output or transient) and i < retries - 1:
+                delay = backoff_delay(i)
+                print(f"Model error, retrying in {delay:.1f}s ({i+1}/{retries}): {e}")
+                await asyncio.sleep(delay)
                 continue
             raise e
 
-def dataagent_node(state: MessagesState):
+def latest_agent_output(messages, name: str) -> Optional[str]:
+    """Return the content of the most recent message from the named agent"""
+    return next((m.content for m in reversed(messages) if m.type == "ai" and m.name == name), None)
+
+def parse_agent_output(messages, name: str, model):
+    """Parse the named agent's JSON output into model, or None if it errored or is missing"""
+    output = latest_agent_output(messages, name)
+    try:
+        return model.model_validate_json(output) if output else None
+    except ValueError:
+        return None
+
+def latest_tool_messages(messages):
+    """Return the tool results from the most recent round of tool calls"""
+    last_call = max((i for i, m in enumerate(messages) if m.type == "ai" and getattr(m, 'tool_calls', None)), default=-1)
+    return [m for m in messages[last_call + 1:] if m.type == "tool"]
+
+def turn_tool_results(messages):
+    """Return one tool result per company for the current turn, across all tool rounds.
+
+    A company re-fetched after an error keeps its latest result, but a successful
+    result is never replaced by a later failure, so data from earlier rounds isn't lost.
+    """
+    turn_start = max((i for i, m in enumerate(messages) if m.type == "human"), default=-1)
+    turn = messages[turn_start + 1:]
+    # Tool errors raised inside ToolNode have no artifact, so fall back to the call's arguments
+    call_args = {tc['id']: tc.get('args', {}) for m in turn if m.type == "ai" for tc in (getattr(m, 'tool_calls', None) or [])}
+
+    results = {}
+    for m in turn:
+        if m.type != "tool":
+            continue
+        artifact = m.artifact if isinstance(m.artifact, dict) else {}
+        company = artifact.get('company') or call_args.get(m.tool_call_id, {}).get('company_name', m.tool_call_id)
+        key = str(company).strip().lower()
+        if tool_result_status(results.get(key)) != 'ok':
+            results[key] = m
+    return list(results.values())
+
+def tool_result_status(msg) -> Optional[str]:
+    """Return the status ScreenerTool attached to a tool result ('ok', 'error' or 'not_found')"""
+    # ToolNode reports exceptions raised by the tool itself as status 'error' with no artifact
+    if getattr(msg, 'status', None) == 'error':
+        return 'error'
+    artifact = getattr(msg, 'artifact', None)
+    return artifact.get('status') if isinstance(artifact, dict) else None
+
+# Headings used when passing earlier agents' outputs to later agents
+AGENT_OUTPUT_LABELS = {
+    "filteragent": "FILTER AGENT ANALYSIS",
+    "riskagent": "RISK AGENT ASSESSMENT",
+}
+
+def build_analysis_prompt(messages, agent_names=()) -> HumanMessage:
+    """Condense the history into the user's question, this turn's tool results and selected agent outputs.
+
+    Analysis agents don't need the data agent's tool-calling turns or each other's
+    full history, so they get this single message instead of every prior message.
+    """
+    question = next((m.content for m in reversed(messages) if m.type == "human"), "")
+
+    tool_results = [m.content for m in turn_tool_results(messages)]
+    if not tool_results:
+        # No tools were called; fall back to whatever the data agent said
+        tool_results = [m.content for m in messages if m.type == "ai" and m.name == "dataagent"][-1:]
+
+    sections = [f"USER QUESTION:\n{question}"]
+    sections.append("FETCHED DATA:\n" + ("\n\n".join(str(r) for r in tool_results) or "No financial data was fetched."))
+    for name in agent_names:
+        output = latest_agent_output(messages, name)
+        if output:
+            sections.append(f"{AGENT_OUTPUT_LABELS[name]}:\n{output}")
+    return HumanMessage(content="\n\n".join(sections))
+
+async def dataagent_node(state: MessagesState):
     messages = state["messages"]
     system_msg = SystemMessage(content=DATA_AGENT_CONTEXT)
     try:
-        response = invoke_with_retry(llm_with_tools, [system_msg] + messages)
+        response = await ainvoke_with_retry(get_llm_with_tools(), [system_msg] + messages)
         if not response.content and not (hasattr(response, 'tool_calls') and response.tool_calls):
             print("Warning: Empty response from dataagent, creating fallback...")
             response = AIMessage(content="I'll fetch the data for you now.")
             response.tool_calls = []
+        response.name = "dataagent"
         return {"messages": [response]}
     except Exception as e:
         print(f"Error in dataagent_node: {e}")
-        return {"messages": [AIMessage(content=f"Error fetching data: {e}")]}
+        # Marked so routing can end the run instead of analysing an error message
+        return {"messages": [AIMessage(content=f"Error fetching data: {e}", name="dataagent", additional_kwargs={'status': 'error'})]}
 
 # Tool execution node
 tool_node = ToolNode(tools)
@@ -125,34 +267,39 @@ ROLE:
 - You filter and analyze the financial data that was collected.
 
 INSTRUCTIONS:
-- Review the conversation history to find the raw financial data.
+- Review the fetched financial data provided below the user's question.
 - Identify stocks with positive metrics (positive ROE, reasonable market cap, etc.).
 - Filter out stocks with poor fundamentals.
-- If no financial data was found in the conversation history, explicitly state that no data is available for filtering and suggest checking the company name.
-- ALWAYS provide a text response summarizing your findings.
+- List every company in either kept or dropped, using the company name from the data.
+- Give a short rationale for each company.
+- If no financial data was fetched, leave kept and dropped empty and explain in the rationale under the key "error" that no data is available and the company name should be checked.
 
-IMPORTANT: You MUST generate a text response explaining what you filtered and why.
+IMPORTANT: You MUST explain what you filtered and why.
 """
 
-def filteragent_node(state: MessagesState):
+async def filteragent_node(state: MessagesState):
     messages = state["messages"]
     system_message = SystemMessage(content=FILTER_AGENT_CONTEXT)
     try:
-        response = invoke_with_retry(llm, [system_message] + messages)
-        if not response.content:
+        result = await ainvoke_with_retry(get_structured_llm(FilterResult), [system_message, build_analysis_prompt(messages)])
+        if result is None:
             print("Warning: Empty response from filteragent, creating fallback...")
             response = AIMessage(content="Based on the data, I've identified stocks with positive fundamentals for further analysis.")
+        else:
+            response = AIMessage(content=result.model_dump_json())
+        response.name = "filteragent"
         return {"messages": [response]}
     except Exception as e:
         print(f"Error in filteragent_node: {e}")
-        return {"messages": [AIMessage(content=f"Error filtering data: {e}")]}
+        return {"messages": [AIMessage(content=f"Error filtering data: {e}", name="filteragent")]}
 
 # Risk Assessment Agent
 RISK_AGENT_CONTEXT = f"""
 {GLOBAL_CONTEXT}
 ROLE:
 - You are the RISK ASSESSMENT AGENT.
-- Your job is to evaluate the financial safety of the companies based on the filtered data.
+- Your job is to evaluate the financial safety of the companies based on the collected data.
+- You run in parallel with the FILTER AGENT, so work directly from the raw financial data.
 
 INSTRUCTIONS:
 - Analyze key financial stability metrics if available:
@@ -160,26 +307,28 @@ INSTRUCTIONS:
   * Interest Coverage Ratio (if inferable from P&L)
   * P/E Ratio (valuation risk)
   * Current Ratio (liquidity)
-- Assign a Risk Level: LOW, MEDIUM, or HIGH.
+- Assign a Risk Level: LOW, MEDIUM, or HIGH, keyed by the company name from the data.
 - JUSTIFY your risk assessment for each stock with specific data points.
-- If no financial data is available, state that a risk assessment cannot be performed due to missing data.
-- ALWAYS provide a text response summarizing your risk analysis.
+- If no financial data is available, leave per_stock empty and state in the justification under the key "error" that a risk assessment cannot be performed due to missing data.
 
-IMPORTANT: You MUST generate a text response explaining the risk profile of each stock.
+IMPORTANT: You MUST justify the risk profile of each stock.
 """
 
-def riskagent_node(state: MessagesState):
+async def riskagent_node(state: MessagesState):
     messages = state["messages"]
     system_message = SystemMessage(content=RISK_AGENT_CONTEXT)
     try:
-        response = invoke_with_retry(llm, [system_message] + messages)
-        if not response.content:
+        result = await ainvoke_with_retry(get_structured_llm(RiskAssessment), [system_message, build_analysis_prompt(messages)])
+        if result is None:
             print("Warning: Empty response from riskagent, creating fallback...")
             response = AIMessage(content="Based on the available data, I've assessed the risk profile of the stocks.")
+        else:
+            response = AIMessage(content=result.model_dump_json())
+        response.name = "riskagent"
         return {"messages": [response]}
     except Exception as e:
         print(f"Error in riskagent_node: {e}")
-        return {"messages": [AIMessage(content=f"Error assessing risk: {e}")]}
+        return {"messages": [AIMessage(content=f"Error assessing risk: {e}", name="riskagent")]}
 
 # Report Agent
 REPORT_AGENT_CONTEXT = f"""
@@ -189,7 +338,8 @@ ROLE:
 - Your job is to compile all previous analyses into a comprehensive, formatted report.
 
 INSTRUCTIONS:
-- Review all previous agent messages (data fetching, filtering, and risk assessment).
+- Review the fetched data and the filter and risk agent outputs (JSON) provided to you.
+- The filtering and risk assessment were produced independently; reconcile them in your report.
 - Create a well-structured final report with:
   * Executive Summary
   * Company Overview
@@ -200,18 +350,126 @@ INSTRUCTIONS:
 - ALWAYS provide a complete text response.
 """
 
-def reportagent_node(state: MessagesState):
+def single_stock_report(filter_result: Optional[FilterResult], risk: Optional[RiskAssessment]) -> Optional[str]:
+    """Build the report from structured results when exactly one stock passed the filter"""
+    if not filter_result or not risk or len(filter_result.kept) != 1:
+        return None
+    stock = filter_result.kept[0]
+    level = risk.per_stock.get(stock)
+    if not level:
+        return None
+
+    lines = [
+        f"## Financial Analysis Report: {stock}",
+        "",
+        "### Filter Result",
+        f"**{stock}** passed the fundamentals filter. {filter_result.rationale.get(stock, '')}".strip(),
+    ]
+    if filter_result.dropped:
+        lines.append("")
+        lines.append("Filtered out:")
+        lines.extend(f"- **{name}**: {filter_result.rationale.get(name, 'Poor fundamentals.')}" for name in filter_result.dropped)
+    lines += [
+        "",
+        "### Risk Assessment",
+        f"**Risk Level:** {level}",
+        "",
+        risk.justification.get(stock, ""),
+        "",
+        "### Recommendation",
+        f"**{stock}** is the only company that passed the filter, with a **{level}** risk profile.",
+    ]
+    return "\n".join(lines)
+
+async def reportagent_node(state: MessagesState):
     messages = state["messages"]
     system_message = SystemMessage(content=REPORT_AGENT_CONTEXT)
+    # A single surviving stock doesn't need a comparison, so fill in the template instead
+    report = single_stock_report(
+        parse_agent_output(messages, "filteragent", FilterResult),
+        parse_agent_output(messages, "riskagent", RiskAssessment),
+    )
+    if report:
+        return {"messages": [AIMessage(content=report, name="reportagent")]}
     try:
-        response = invoke_with_retry(llm, [system_message] + messages)
+        response = await ainvoke_with_retry(get_llm(), [system_message, build_analysis_prompt(messages, ANALYSIS_AGENTS)])
         if not response.content:
             print("Warning: Empty response from reportagent, creating fallback...")
             response = AIMessage(content="## Financial Analysis Report\n\nBased on the analysis conducted, please refer to the previous agent outputs for details.")
+        response.name = "reportagent"
         return {"messages": [response]}
     except Exception as e:
         print(f"Error in reportagent_node: {e}")
-        return {"messages": [AIMessage(content=f"Error generating report: {e}")]}
+        return {"messages": [AIMessage(content=f"Error generating report: {e}", name="reportagent")]}
+
+# Fast Path Agent
+FAST_PATH_AGENT_CONTEXT = f"""
+{GLOBAL_CONTEXT}
+ROLE:
+- You are the FILTER, RISK ASSESSMENT and REPORT GENERATION agents combined.
+- You are used when data for a single company was fetched, and produce the final report in one response.
+
+INSTRUCTIONS:
+- Decide whether the company has positive metrics (positive ROE, reasonable market cap, etc.) or poor fundamentals, and give a short rationale.
+- Assign a Risk Level: LOW, MEDIUM, or HIGH using Debt-to-Equity, Interest Coverage, P/E and Current Ratio where inferable, and JUSTIFY it with specific data points.
+- Create a well-structured final report with:
+  * Executive Summary
+  * Company Overview
+  * Financial Data Summary
+  * Filter Result
+  * Risk Assessment (including the Risk Level)
+  * Recommendation
+- Use markdown formatting for better readability.
+- ALWAYS provide a complete text response.
+"""
+
+async def fastpath_agent_node(state: MessagesState):
+    messages = state["messages"]
+    system_message = SystemMessage(content=FAST_PATH_AGENT_CONTEXT)
+    try:
+        # Plain text rather than structured output so the report can be streamed token by token
+        response = await ainvoke_with_retry(get_llm(), [system_message, build_analysis_prompt(messages)])
+        if not response.content:
+            print("Warning: Empty response from fastpath, creating fallback...")
+            response = AIMessage(content="## Financial Analysis Report\n\nThe analysis could not be completed. Please try again.")
+        response.name = "reportagent"
+        return {"messages": [response]}
+    except Exception as e:
+        print(f"Error in fastpath_agent_node: {e}")
+        return {"messages": [AIMessage(content=f"Error generating report: {e}", name="reportagent")]}
+
+NOT_FOUND_RESPONSE = """## Company Not Found
+
+I couldn't find {companies} on Screener.in.
+
+Please check the spelling, or try the NSE/BSE symbol instead (e.g. "RELIANCE", "TCS", "INFY").
+"""
+
+NO_COMPANY_RESPONSE = """## No Company Requested
+
+I can analyse Indian stocks listed on Screener.in. Ask about a company by name or NSE/BSE symbol (e.g. "Reliance", "TCS", "INFY").
+"""
+
+def notfound_node(state: MessagesState):
+    """Answer with a fixed message when no requested company exists, without calling Gemini"""
+    results = turn_tool_results(state["messages"])
+    # The data agent answered without looking anything up, e.g. a greeting
+    if not results:
+        return {"messages": [AIMessage(content=NO_COMPANY_RESPONSE, name="notfound")]}
+    companies = [(m.artifact or {}).get('company', '') for m in results]
+    names = ", ".join(f"**{name}**" for name in companies if name) or "the requested company"
+    return {"messages": [AIMessage(content=NOT_FOUND_RESPONSE.format(companies=names), name="notfound")]}
+
+DATA_ERROR_RESPONSE = """## Data Unavailable
+
+I couldn't fetch the financial data for your request because the analysis service ran into an error.
+
+Please try again in a moment.
+"""
+
+def dataerror_node(state: MessagesState):
+    """Answer with a fixed message when the data agent failed, without calling Gemini"""
+    return {"messages": [AIMessage(content=DATA_ERROR_RESPONSE, name="dataerror")]}
 
 # Build the graph
 builder = StateGraph(MessagesState)
@@ -220,25 +478,49 @@ builder.add_node("tools", tool_node)
 builder.add_node("filteragent", filteragent_node)
 builder.add_node("riskagent", riskagent_node)
 builder.add_node("reportagent", reportagent_node)
+builder.add_node("notfound", notfound_node)
+builder.add_node("dataerror", dataerror_node)
+builder.add_node("fastpath", fastpath_agent_node)
 builder.add_edge(START, "dataagent")
 
+# Filter and risk agents only read the fetched data, so they run in parallel
+ANALYSIS_AGENTS = ["filteragent", "riskagent"]
+
 def route_after_dataagent(state: MessagesState):
     last_msg = state["messages"][-1]
+    if last_msg.additional_kwargs.get('status') == 'error':
+        return "dataerror"
     if hasattr(last_msg, 'tool_calls') and last_msg.tool_calls:
         return "tools"
-    return "filteragent"
+    # The data agent is done fetching, either after a greeting or after giving up on failed lookups
+    return route_on_turn_results(state["messages"])
 
 def route_after_tools(state: MessagesState):
-    last_msg = state["messages"][-1]
-    if hasattr(last_msg, 'content') and 'error' in str(last_msg.content).lower():
+    last_round = latest_tool_messages(state["messages"])
+    # Let the data agent retry the calls that just failed
+    if any(tool_result_status(m) == 'error' for m in last_round):
         return "dataagent"
-    return "filteragent"
-
-builder.add_conditional_edges("dataagent", route_after_dataagent)
-builder.add_conditional_edges("tools", route_after_tools)
-builder.add_edge("filteragent", "riskagent")
-builder.add_edge("riskagent", "reportagent")
+    return route_on_turn_results(state["messages"])
+
+def route_on_turn_results(messages):
+    """Pick the analysis step from this turn's tool results"""
+    statuses = [tool_result_status(m) for m in turn_tool_results(messages)]
+    # Nothing to analyse if none of the companies requested this turn were fetched
+    if 'ok' not in statuses:
+        return "dataerror" if 'error' in statuses else "notfound"
+    # A single stock with data has nothing to compare, so one fused call replaces filter, risk and report
+    if statuses.count('ok') == 1:
+        return "fastpath"
+    return ANALYSIS_AGENTS
+
+builder.add_conditional_edges("dataagent", route_after_dataagent, ["tools", "dataerror", "notfound", "fastpath"] + ANALYSIS_AGENTS)
+builder.add_conditional_edges("tools", route_after_tools, ["dataagent", "notfound", "fastpath"] + ANALYSIS_AGENTS)
+# Report agent joins both branches and waits for them to finish
+builder.add_edge(ANALYSIS_AGENTS, "reportagent")
 builder.add_edge("reportagent", END)
+builder.add_edge("notfound", END)
+builder.add_edge("dataerror", END)
+builder.add_edge("fastpath", END)
 
 graph = builder.compile()
 
@@ -249,7 +531,7 @@ async def chat_endpoint(request: ChatRequest):
         print(f"Received request: {user_input}")
         inputs = {"messages": [HumanMessage(content=user_input)]}
         
-        final_state = graph.invoke(inputs)
+        final_state = await graph.ainvoke(inputs)
         
         final_message = final_state["messages"][-1]
         content = final_message.content if hasattr(final_message, 'content') else "No content generated."
@@ -259,7 +541,57 @@ async def chat_endpoint(request: ChatRequest):
         print(f"Error processing request: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Nodes whose output is the final answer
+FINAL_NODES = ("reportagent", "notfound", "dataerror", "fastpath")
+# Nodes whose model output is the report itself
+STREAMED_NODES = ("reportagent", "fastpath")
+
+def sse_event(payload: Dict[str, Any]) -> str:
+    """Encode a payload as a server-sent event"""
+    return f"data: {json.dumps(payload)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    user_input = request.message
+    print(f"Received streaming request: {user_input}")
+    inputs = {"messages": [HumanMessage(content=user_input)]}
+
+    async def event_gen():
+        # Text the client currently holds for the report
+        streamed = []
+        try:
+            async for ev in graph.astream_events(inputs, version="v2"):
+                node = ev.get("metadata", {}).get("langgraph_node")
+                if ev["event"] == "on_chat_model_start" and node in STREAMED_NODES and streamed:
+                    # A retried model call starts the report over
+                    streamed = []
+                    yield sse_event({"reset": True})
+                elif ev["event"] == "on_chat_model_stream" and node in STREAMED_NODES:
+                    token = ev["data"]["chunk"].content
+                    if isinstance(token, str) and token:
+                        streamed.append(token)
+                        yield sse_event({"token": token})
+                elif ev["event"] == "on_chain_end" and ev["name"] in FINAL_NODES:
+                    messages = ev["data"].get("output", {}).get("messages", [])
+                    final = messages[-1].content if messages else ""
+                    # Fallback, error and template replies aren't streamed by the model, so
+                    # replace whatever the client holds whenever it differs from the final answer
+                    if isinstance(final, str) and final and final != "".join(streamed):
+                        if streamed:
+                            yield sse_event({"reset": True})
+                        streamed = [final]
+                        yield sse_event({"token": final})
+        except Exception as e:
+            print(f"Error processing streaming request: {e}")
+            yield sse_event({"error": str(e)})
+        yield sse_event({"done": True})
+
+    return StreamingResponse(event_gen(), media_type="text/event-stream")
+
 if __name__ == "__main__":
-    print("Starting FastAPI Server on port 8001...")
+    # Each worker is a separate process with its own event loop, HTTP pools and Gemini client
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    print(f"Starting FastAPI Server on port 8001 with {workers} worker(s)...")
     print("Financial Report Agent with OCR correction enabled")
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    # "auto" picks uvloop and httptools when installed (uvicorn[standard]); uvloop isn't available on Windows
+    uvicorn.run("main:app", host="0.0.0.0", port=8001, workers=workers, loop="auto", http="auto")
\ No newline at end of file
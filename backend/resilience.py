@@ -0,0 +1,74 @@
+
+"""
+Retry backoff and circuit breaker helpers
+Used to stop hammering Gemini while it is rate limiting or down
+"""
+
+import random
+import time
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Exponential backoff for the given attempt (0-based) with +/-50% jitter"""
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+
+class CircuitBreaker:
+    """Fails fast after repeated failures until a cool-down has passed"""
+
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Return True if a call may go through, moving OPEN to HALF_OPEN after the cool-down"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            # Only one trial call at a time; its result decides the state
+            if self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+        return True
+
+    def check(self) -> None:
+        """Raise CircuitOpenError if the call should be rejected"""
+        if not self.allow_request():
+            if self.state == self.HALF_OPEN:
+                raise CircuitOpenError(f"{self.name} is recovering, a trial call is in progress")
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError(f"{self.name} is unavailable, retry in {remaining:.0f}s")
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.state = self.CLOSED
+        self.trial_in_flight = False
+
+    def record_release(self) -> None:
+        """End a call whose outcome says nothing about the service's health"""
+        if self.state == self.HALF_OPEN:
+            self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.trial_in_flight = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                print(f"Circuit '{self.name}' opened after {self.failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
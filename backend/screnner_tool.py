@@ -5,14 +5,131 @@ This tool allows a financial agent to fetch stock data from Screener.in
 """
 
 from langchain.tools import BaseTool
-from typing import Optional, Type
+from typing import Optional, Tuple, Type
 from pydantic import BaseModel, Field
+import asyncio
+import httpx
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import json
-import re
+import os
+import weakref
+
+from cache import FileCache, cached
+from resilience import backoff_delay
+
+
+SEARCH_URL = "https://www.screener.in/api/company/search/"
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Referer': 'https://www.screener.in/'
+}
+
+# Top ratio labels on the company page mapped to the fields they populate
+FIELD_MAP = {
+    'Market Cap': 'market_cap',
+    'Current Price': 'current_price',
+    'Stock P/E': 'stock_pe',
+    'Book Value': 'book_value',
+    'Dividend Yield': 'dividend_yield',
+    'ROCE': 'roce',
+    'ROE': 'roe',
+    'Face Value': 'face_value',
+}
+
+# Only build the parts of the company page we read: the name heading, top
+# ratio list items, report sections and growth range tables
+PAGE_STRAINER = SoupStrainer(['section', 'table', 'h1', 'li'])
+
+# Company search results rarely change; page data includes the live price
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+# Separate directories, since each cache sweeps its own by TTL
+search_cache = FileCache(dir=os.path.join(CACHE_DIR, 'search'), ttl_seconds=30 * 24 * 60 * 60)
+scrape_cache = FileCache(dir=os.path.join(CACHE_DIR, 'scrape'), ttl_seconds=6 * 60 * 60)
+
+
+def _build_session() -> requests.Session:
+    """Create the pooled requests session shared by all ScreenerTool instances"""
+    session = requests.Session()
+    retries = Retry(
+        total=3,
+        backoff_factor=0.5,
+        backoff_jitter=0.5,
+        respect_retry_after_header=True,
+        status_forcelist=[429, 500, 502, 503, 504],
+    )
+    session.mount('https://', HTTPAdapter(pool_connections=20, pool_maxsize=50, max_retries=retries))
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+_SESSION = _build_session()
+
+# httpx clients can't be shared across event loops, so keep one per loop
+_ASYNC_CLIENTS = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the process-wide AsyncClient for the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    client = _ASYNC_CLIENTS.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=15,
+            transport=httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            ),
+        )
+        _ASYNC_CLIENTS[loop] = client
+    return client
+
+
+# Same policy as the requests session: retry rate limits and server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRIES = 3
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds the server asked us to wait, if it sent a numeric Retry-After"""
+    try:
+        return min(float(response.headers['Retry-After']), 30.0)
+    except (KeyError, ValueError):
+        return None
+
+
+async def _get_with_retry(url: str, **kwargs) -> httpx.Response:
+    """GET through the shared AsyncClient, retrying transport errors, 429 and 5xx with jittered backoff"""
+    client = get_async_client()
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            response = await client.get(url, **kwargs)
+        except httpx.TransportError:
+            if attempt == MAX_RETRIES:
+                raise
+            await asyncio.sleep(backoff_delay(attempt))
+            continue
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return response
+        delay = _retry_after(response)
+        await asyncio.sleep(delay if delay is not None else backoff_delay(attempt))
+
+
+def _search_key(self, company_name: str) -> str:
+    return f"search:{company_name.strip().lower()}"
+
+
+def _scrape_key(self, url: str) -> str:
+    return f"scrape:{url}"
+
+
+def _is_scrape_result(value) -> bool:
+    return isinstance(value, dict) and 'error' not in value
 
 
 class ScreenerInputSchema(BaseModel):
@@ -33,47 +150,81 @@ class ScreenerTool(BaseTool):
     quarterly results, profit & loss, balance sheet data, and more.
     """
     args_schema: Type[BaseModel] = ScreenerInputSchema
+    # The artifact carries a status dict that the graph routes on without reading the content
+    response_format: str = "content_and_artifact"
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self._session = requests.Session()
-        retries = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
-        self._session.mount('https://', HTTPAdapter(max_retries=retries))
-        self._session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Referer': 'https://www.screener.in/'
-        })
+        # Connection pools are shared across instances so keep-alive connections are reused
+        self._session = _SESSION
 
+    @staticmethod
+    def _company_url_from_results(results) -> Optional[str]:
+        """Return the URL of the first matching company in search results"""
+        if results and len(results) > 0:
+            company_url = results[0].get('url')
+            return f"https://www.screener.in{company_url}" if company_url else None
+        return None
+
+    @cached(search_cache, key=_search_key)
     def _search_company(self, company_name: str) -> Optional[str]:
         """Search for company and return the company URL"""
-        search_url = "https://www.screener.in/api/company/search/"
-        
         try:
             params = {'q': company_name}
-            response = self._session.get(search_url, params=params, timeout=10)
+            response = self._session.get(SEARCH_URL, params=params, timeout=10)
             response.raise_for_status()
-            
-            results = response.json()
-            if results and len(results) > 0:
-                # Return the URL of the first matching company
-                company_url = results[0].get('url')
-                return f"https://www.screener.in{company_url}" if company_url else None
-            return None
+            return self._company_url_from_results(response.json())
             
         except Exception as e:
             # Return the error as a string so it can be propagated
             print(f"Error searching company: {e}")
             return None
+
+    @cached(search_cache, key=_search_key)
+    async def _search_company_async(self, company_name: str) -> Optional[str]:
+        """Async version of _search_company"""
+        try:
+            params = {'q': company_name}
+            response = await _get_with_retry(SEARCH_URL, params=params, timeout=10)
+            response.raise_for_status()
+            return self._company_url_from_results(response.json())
+
+        except Exception as e:
+            print(f"Error searching company: {e}")
+            return None
     
+    @cached(scrape_cache, key=_scrape_key, should_cache=_is_scrape_result)
     def _scrape_company_data(self, url: str) -> dict:
         """Scrape financial data from company page"""
         try:
             response = self._session.get(url, timeout=15)
             response.raise_for_status()
+            return self._parse_company_page(url, response.content)
+        except Exception as e:
+            return {'error': f"Error scraping data: {str(e)}"}
+
+    @cached(scrape_cache, key=_scrape_key, should_cache=_is_scrape_result)
+    async def _scrape_company_data_async(self, url: str) -> dict:
+        """Async version of _scrape_company_data"""
+        try:
+            response = await _get_with_retry(url, timeout=15)
+            response.raise_for_status()
+            # Parsing is CPU-bound, keep it off the event loop
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._parse_company_page, url, response.content)
+        except Exception as e:
+            return {'error': f"Error scraping data: {str(e)}"}
+
+    def _parse_company_page(self, url: str, content: bytes) -> dict:
+        """Parse financial data out of a company page"""
+        try:
+            soup = BeautifulSoup(content, 'lxml', parse_only=PAGE_STRAINER)
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Index sections and growth tables in a single walk of the document
+            sections_by_id = {}
+            for section in soup.select('section[id]'):
+                sections_by_id.setdefault(section['id'], section)
+            ranges_tables = soup.select('table.ranges-table')
             
             data = {
                 'url': url,
@@ -101,41 +252,28 @@ class ScreenerTool(BaseTool):
             }
             
             # Extract company name
-            company_name = soup.find('h1', class_='h2')
+            company_name = soup.select_one('h1.h2')
             if company_name:
                 data['company_name'] = company_name.text.strip()
             
             # Extract key metrics from the top ratios section
-            ratios = soup.find_all('li', class_='flex flex-space-between')
+            ratios = soup.select('li.flex.flex-space-between')
             for ratio in ratios:
-                name_elem = ratio.find('span', class_='name')
-                value_elem = ratio.find('span', class_='number')
+                name_elem = ratio.select_one('span.name')
+                value_elem = ratio.select_one('span.number')
                 if name_elem and value_elem:
                     key = name_elem.text.strip()
                     value = value_elem.text.strip()
                     data['key_metrics'][key] = value
                     
                     # Also populate main fields
-                    if 'Market Cap' in key:
-                        data['market_cap'] = value
-                    elif 'Current Price' in key:
-                        data['current_price'] = value
-                    elif 'Stock P/E' in key:
-                        data['stock_pe'] = value
-                    elif 'Book Value' in key:
-                        data['book_value'] = value
-                    elif 'Dividend Yield' in key:
-                        data['dividend_yield'] = value
-                    elif 'ROCE' in key:
-                        data['roce'] = value
-                    elif 'ROE' in key:
-                        data['roe'] = value
-                    elif 'Face Value' in key:
-                        data['face_value'] = value
+                    field = FIELD_MAP.get(key)
+                    if field:
+                        data[field] = value
             
             # Helper function to extract table data
             def extract_table_data(section_id):
-                section = soup.find('section', id=section_id)
+                section = sections_by_id.get(section_id)
                 if not section:
                     return []
                 
@@ -181,7 +319,7 @@ class ScreenerTool(BaseTool):
             
             # Extract Ratios - Robust Method
             # Try finding section by ID first, then by text
-            ratios_section = soup.find('section', id='ratios')
+            ratios_section = sections_by_id.get('ratios')
             if not ratios_section:
                  # Look for any heading with "Ratios"
                  for h in soup.find_all(['h2', 'h3']):
@@ -201,7 +339,7 @@ class ScreenerTool(BaseTool):
                             data['ratios'][ratio_name] = ratio_values
 
             # Extract Peer Comparison
-            peers_section = soup.find('section', id='peers')
+            peers_section = sections_by_id.get('peers')
             if peers_section:
                 table = peers_section.find('table')
                 if table:
@@ -218,8 +356,6 @@ class ScreenerTool(BaseTool):
             # Extract Growth Metrics - Robust Method
             # Based on inspection: <table class="ranges-table"><tr><th colspan="2">Compounded Sales Growth</th></tr>...
             
-            ranges_tables = soup.find_all('table', class_='ranges-table')
-            
             for table in ranges_tables:
                 # Get the header text
                 th = table.find('th')
@@ -252,79 +388,57 @@ class ScreenerTool(BaseTool):
         except Exception as e:
             return {'error': f"Error scraping data: {str(e)}"}
     
-    def _run(self, company_name: str) -> str:
+    def _run(self, company_name: str) -> Tuple[str, dict]:
         """Execute the tool to fetch financial data"""
         
         # Step 1: Search for the company
         company_url = self._search_company(company_name)
         
         if not company_url:
-            return f"Could not find company '{company_name}' on Screener.in. Please check the company name and try again."
+            return self._not_found(company_name)
         
         # Step 2: Scrape the company data
         financial_data = self._scrape_company_data(company_url)
         
         if 'error' in financial_data:
-            return f"Error fetching data: {financial_data['error']}"
+            return self._error(company_name, financial_data['error'])
         
         # Step 3: Format the output
-        import json
-        output = f"""
-Financial Data for {financial_data.get('company_name', company_name)}
-{'='*60}
-
-CURRENT METRICS:
-Current Price: {financial_data.get('current_price', 'N/A')}
-Market Cap: {financial_data.get('market_cap', 'N/A')}
-Stock P/E: {financial_data.get('stock_pe', 'N/A')}
-Book Value: {financial_data.get('book_value', 'N/A')}
-Dividend Yield: {financial_data.get('dividend_yield', 'N/A')}
-ROCE: {financial_data.get('roce', 'N/A')}
-ROE: {financial_data.get('roe', 'N/A')}
+        return self._format_output(company_name, financial_data)
 
-KEY METRICS:
-{json.dumps(financial_data.get('key_metrics', {}))}
+    @staticmethod
+    def _not_found(company_name: str) -> Tuple[str, dict]:
+        """Not-found result; the graph uses its status to skip analysis"""
+        message = f"Could not find company '{company_name}' on Screener.in. Please check the company name and try again."
+        return message, {'status': 'not_found', 'company': company_name}
 
-PEER COMPARISON:
-{json.dumps(financial_data.get('peer_comparison', []))}
+    @staticmethod
+    def _error(company_name: str, error: str) -> Tuple[str, dict]:
+        """Error result; the graph routes back to the data agent on this status"""
+        return f"Error fetching data: {error}", {'status': 'error', 'company': company_name}
 
-QUARTERLY RESULTS (Last 4 Quarters):
-{json.dumps(financial_data.get('quarterly_results', []))}
-
-PROFIT & LOSS (Last 5 Years):
-{json.dumps(financial_data.get('profit_loss', []))}
-
-BALANCE SHEET:
-{json.dumps(financial_data.get('balance_sheet', []))}
-
-CASH FLOWS:
-{json.dumps(financial_data.get('cash_flows', []))}
-
-RATIOS:
-{json.dumps(financial_data.get('ratios', {}))}
-
-SHAREHOLDING PATTERN:
-{json.dumps(financial_data.get('shareholding_pattern', []))}
-
-COMPOUNDED SALES GROWTH:
-{json.dumps(financial_data.get('compounded_sales_growth', {}))}
+    def _format_output(self, company_name: str, financial_data: dict) -> Tuple[str, dict]:
+        """Format scraped financial data as text for the agent"""
+        parts = [
+            f"Financial Data for {financial_data.get('company_name') or company_name}",
+            # One compact JSON blob: no per-section dumps and no padding whitespace
+            json.dumps(financial_data, ensure_ascii=False, separators=(',', ':')),
+        ]
+        return "\n".join(parts), {'status': 'ok', 'company': company_name}
+    
+    async def _arun(self, company_name: str) -> Tuple[str, dict]:
+        """Async version of the tool"""
+        # Step 1: Search for the company
+        company_url = await self._search_company_async(company_name)
 
-COMPOUNDED PROFIT GROWTH:
-{json.dumps(financial_data.get('compounded_profit_growth', {}))}
+        if not company_url:
+            return self._not_found(company_name)
 
-STOCK PRICE CAGR:
-{json.dumps(financial_data.get('stock_price_cagr', {}))}
+        # Step 2: Scrape the company data
+        financial_data = await self._scrape_company_data_async(company_url)
 
-RETURN ON EQUITY (Historical):
-{json.dumps(financial_data.get('return_on_equity', {}))}
+        if 'error' in financial_data:
+            return self._error(company_name, financial_data['error'])
 
-Source: {financial_data.get('url', '')}
-"""
-        
-        return output.strip()
-    
-    async def _arun(self, company_name: str) -> str:
-        """Async version of the tool"""
-        # For simplicity, calling the sync version
-        # In production, you'd want to use aiohttp for async requests
-        return self._run(company_name)
\ No newline at end of file
+        # Step 3: Format the output
+        return self._format_output(company_name, financial_data)
\ No newline at end of file
@@ -58,6 +58,58 @@ const callBackend = async (prompt: string) => {
   }
 };
 
+/**
+ * Streams the report from /chat/stream (server-sent events).
+ * onText receives the full text so far; a "reset" event means the backend restarted the report.
+ */
+const callBackendStream = async (prompt: string, onText: (text: string) => void) => {
+  let text = "";
+  try {
+    const response = await fetch(`${BACKEND_URL}/chat/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ message: prompt })
+    });
+
+    if (!response.ok || !response.body) {
+      throw new Error(`Backend Error: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Events are separated by a blank line
+      const events = buffer.split("\n\n");
+      buffer = events.pop() || "";
+      for (const event of events) {
+        if (!event.startsWith("data: ")) continue;
+        const payload = JSON.parse(event.slice(6));
+        if (payload.reset) {
+          text = "";
+        } else if (payload.token) {
+          text += payload.token;
+        } else if (payload.error) {
+          text = `Analysis failed: ${payload.error}`;
+        } else {
+          continue;
+        }
+        onText(text);
+      }
+    }
+
+    return text || "Analysis unavailable.";
+  } catch (error) {
+    console.error("Backend API Error:", error);
+    return "I apologize, but I'm having trouble connecting to the analysis backend. Please ensure the backend server is running on port 8001.";
+  }
+};
+
 // Legacy function name for compatibility
 const callGemini = callBackend;
 
@@ -457,16 +509,23 @@ export default function Home() {
         If the user asks a general question, answer it concisely but professionally.
       `;
 
-      const responseText = await callGemini(prompt);
-
-      const assistantMessage = {
-        id: (Date.now() + 1).toString(),
-        role: 'assistant',
-        content: responseText,
-        timestamp: new Date(),
-        isReport: responseText.includes('##')
+      const assistantId = (Date.now() + 1).toString();
+      // Add the assistant message on the first update, then keep replacing its content
+      const showResponse = (text: string) => {
+        const assistantMessage: Message = {
+          id: assistantId,
+          role: 'assistant',
+          content: text,
+          timestamp: new Date(),
+          isReport: text.includes('##')
+        };
+        setMessages((prev) => prev.some((m) => m.id === assistantId)
+          ? prev.map((m) => (m.id === assistantId ? assistantMessage : m))
+          : [...prev, assistantMessage]);
       };
-      setMessages((prev) => [...prev, assistantMessage]);
+
+      const responseText = await callBackendStream(prompt, showResponse);
+      showResponse(responseText);
     } catch (error) {
       console.error('Error:', error);
       const errorMessage = {